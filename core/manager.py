@@ -1,13 +1,18 @@
+import asyncio
 import threading
 import serial.tools.list_ports
-import json
+import serial_asyncio
+import orjson
+from functools import partial
 from typing import Callable
 import logging
 
 import rclpy
+from rclpy.executors import SingleThreadedExecutor
 from rclpy.qos import QoSProfile
 from espkenisis_msgs.msg import ChannelOverride
 
+from .serial_protocol import SerialLineProtocol
 from .target import Target
 
 
@@ -15,10 +20,13 @@ class ESPKinesisManager:
     def __init__(self, callback_on_targets_update: Callable[[dict], None]):
         self.__callback_on_targets_update = callback_on_targets_update
 
-        self.__serial = None
+        self.__serial_loop = None
+        self.__serial_loop_thread = None
+        self.__serial_transport = None
+        self.__serial_buffer_size = 1 << 16
+        self.__override_prefixes: dict[int, bytes] = {}  # {target_id: encoded prefix}
 
         self.__is_connected = False
-        self.__read_serial_thread = None
 
         self.__logger = logging.getLogger(__name__)
         self.__logger.info("Initializing ESPKinesisManager")
@@ -27,28 +35,66 @@ class ESPKinesisManager:
         self.__data_handlers["targets_update"] = self.__handle_targets_update
 
         self.__targets: list[Target] = []
+        self.__last_targets_snapshot: bytes | None = None
 
         self.__ros_node = None
+        self.__ros_executor = None
         self.__ros_thread = None
         self.__ros_subs = {}  # {target_id: subscription} TODO: Revise this
         self.__is_ros_running = False
 
-    def get_all_ports(self):
+    def get_all_ports(self) -> list[str]:
         ports = [port.device for port in serial.tools.list_ports.comports()]
         self.__logger.debug(f"Available ports: {ports}")
         return ports
 
     def connect(self, port: str, baudrate: int = 115200) -> bool:
+        serial_port = None
         try:
             self.__logger.info(f"Connecting to {port} at {baudrate} baud")
-            self.__serial = serial.Serial(port, baudrate, timeout=1)
-            self.__is_connected = True
-
-            self.__read_serial_thread = threading.Thread(
-                target=self.__read_serial, daemon=True
+            # Each connection gets its own loop, which also identifies it in callbacks
+            loop = asyncio.new_event_loop()
+            self.__serial_loop = loop
+            self.__serial_loop_thread = threading.Thread(
+                target=self.__run_serial_loop, args=(loop,), daemon=True
             )
-            self.__read_serial_thread.start()
-            self.__logger.debug("Started serial read thread")
+            self.__serial_loop_thread.start()
+            self.__logger.debug("Started serial event loop thread")
+
+            # The port is opened here so a failed open leaves nothing on the loop,
+            # the coroutine below only wraps it and does no I/O
+            serial_port = serial.serial_for_url(port, baudrate=baudrate)
+
+            # On POSIX the transport waits on the port's fd through the loop's
+            # selector. Windows serial handles can't be selected, so there
+            # pyserial-asyncio polls the port instead
+            future = asyncio.run_coroutine_threadsafe(
+                serial_asyncio.connection_for_serial(
+                    loop,
+                    lambda: SerialLineProtocol(
+                        callback_on_line=self.__handle_serial_line,
+                        callback_on_connection_lost=partial(
+                            self.__handle_serial_lost, loop
+                        ),
+                    ),
+                    serial_port,
+                ),
+                loop,
+            )
+            self.__serial_transport, _ = future.result()
+
+            # pyserial-asyncio hardcodes 1 KiB reads per wakeup and has no public
+            # setting for it, so this overrides a private attribute. The version is
+            # pinned in requirements.txt, warn if it goes away anyway
+            if hasattr(self.__serial_transport, "_max_read_size"):
+                self.__serial_transport._max_read_size = self.__serial_buffer_size
+            else:
+                self.__logger.warning(
+                    "SerialTransport has no _max_read_size, reads stay at the default"
+                )
+            if hasattr(serial_port, "set_buffer_size"):  # Windows only
+                serial_port.set_buffer_size(rx_size=self.__serial_buffer_size)
+            self.__is_connected = True
 
             self.__logger.info(f"Successfully connected to {port}")
 
@@ -56,72 +102,112 @@ class ESPKinesisManager:
             return True
         except Exception as e:
             self.__logger.error(f"Connection error: {e}", exc_info=True)
+            if serial_port and not self.__serial_transport:
+                serial_port.close()
+            self.__close_serial()
             return False
 
     def disconnect(self):
-        if self.__read_serial_thread:
-            self.__read_serial_thread.join(timeout=1.0)
-        if self.__serial:
-            self.__serial.close()
-
-        self.__serial = None
         self.__is_connected = False
-        self.__read_serial_thread = None
+        self.__close_serial()
+        self.__last_targets_snapshot = None
 
         self.__stop_ros()
         self.__logger.info("Disconnected")
 
-    def __read_serial(self):
-        if not self.__serial:
-            self.__logger.error("Serial not connected")
-            return
+    def __close_serial(self):
+        loop = self.__serial_loop
+        thread = self.__serial_loop_thread
+        transport = self.__serial_transport
 
-        buffer = ""
-        while self.__is_connected:
+        self.__serial_transport = None
+        self.__serial_loop = None
+        self.__serial_loop_thread = None
+
+        if loop:
             try:
-                if self.__serial.in_waiting > 0:
-                    new_data = self.__serial.read(self.__serial.in_waiting).decode()
-                    buffer += new_data
-
-                    lines = buffer.split("\n")
-                    buffer = lines.pop()
-
-                    for line in lines:
-                        line = line.strip()
-                        if not line:
-                            continue
-
-                        try:
-                            data = json.loads(line)
-                            self.__process_data(data)
-                        except json.JSONDecodeError:
-                            self.__logger.error(f"Invalid JSON: {line}")
-            except Exception as e:
-                self.__logger.error(f"Serial read error: {e}", exc_info=True)
-                self.__is_connected = False
+                loop.call_soon_threadsafe(self.__shutdown_serial_loop, loop, transport)
+            except RuntimeError:
+                pass  # Loop already closed itself after the connection was lost
+        if thread:
+            thread.join(timeout=1.0)
+            if thread.is_alive():
+                # The loop stops and closes itself once pending writes drain
+                self.__logger.warning(
+                    "Serial port still flushing, closing in background"
+                )
+
+    @staticmethod
+    def __run_serial_loop(loop: asyncio.AbstractEventLoop):
+        loop.run_forever()
+        loop.close()
+
+    @staticmethod
+    def __shutdown_serial_loop(loop: asyncio.AbstractEventLoop, transport):
+        # Runs on the loop thread. close() flushes pending writes before calling
+        # connection_lost, which stops the loop, so nothing is stopped here directly
+        if transport and not transport.is_closing():
+            transport.close()
+        elif not transport:
+            loop.stop()
+
+    def __handle_serial_line(self, line: bytes):
+        try:
+            data = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            self.__logger.error("Invalid JSON: %r", line)
+            return
+
+        self.__process_data(data)
+
+    def __handle_serial_lost(
+        self, loop: asyncio.AbstractEventLoop, exc: Exception | None
+    ):
+        # The port is closed by now and the loop has nothing left to serve
+        loop.stop()
+
+        if loop is not self.__serial_loop:
+            return  # Late notification from a connection already torn down
+        if exc:
+            self.__logger.error(f"Serial read error: {exc}", exc_info=exc)
+        self.__is_connected = False
 
     def __process_data(self, data: dict):
-        if "type" not in data:
+        data_type = data.get("type")
+        if data_type is None:
             self.__logger.error("Data missing 'type' field")
             return
 
-        data_type = data["type"]
-        if data_type in self.__data_handlers:
-            self.__data_handlers[data_type](data)
+        handler = self.__data_handlers.get(data_type)
+        if handler is not None:
+            handler(data)
 
     def __handle_targets_update(self, data: dict):
-        if "targets" not in data:
+        targets = data.get("targets")
+        if targets is None:
             self.__logger.error("Targets update missing 'targets' field")
             return
+        if not isinstance(targets, list):
+            self.__logger.error("Targets update 'targets' field is not a list")
+            return
 
-        targets = data["targets"]
+        # Firmware resends identical snapshots periodically, these were already
+        # validated and delivered so skip them before doing any per-target work
+        snapshot = orjson.dumps(targets, option=orjson.OPT_SORT_KEYS)
+        if snapshot == self.__last_targets_snapshot:
+            return
+
+        required_fields = Target.REQUIRED_FIELDS
         for target in targets:
-            required_fields = Target.get_fields()
-            if not all(field in target for field in required_fields):
-                self.__logger.error(f"Target missing required fields, target: {target}")
+            if not isinstance(target, dict) or not required_fields <= target.keys():
+                self.__logger.error(
+                    "Target missing required fields, target: %s", target
+                )
                 return
 
-        self.__logger.debug(f"Pushing targets update to UI: {targets}")
+        self.__last_targets_snapshot = snapshot
+
+        self.__logger.debug("Pushing targets update to UI: %s", targets)
         self.__callback_on_targets_update(targets)
 
     def __start_ros(self):
@@ -132,10 +218,14 @@ class ESPKinesisManager:
         try:
             rclpy.init()
             self.__ros_node = rclpy.create_node("espkinesis_manager")
+            self.__ros_executor = SingleThreadedExecutor()
+            self.__ros_executor.add_node(self.__ros_node)
             self.__is_ros_running = True
             self.__logger.debug("Initialized ROS node")
 
-            self.__ros_thread = threading.Thread(target=self.__ros_spin, daemon=True)
+            self.__ros_thread = threading.Thread(
+                target=self.__ros_executor.spin, daemon=True
+            )
             self.__ros_thread.start()
             self.__logger.debug("Started ROS spin thread")
 
@@ -147,6 +237,10 @@ class ESPKinesisManager:
             )
 
     def __stop_ros(self):
+        self.__is_ros_running = False
+        if self.__ros_executor:
+            # Wakes the spinning thread and makes spin() return
+            self.__ros_executor.shutdown()
         if self.__ros_thread:
             self.__ros_thread.join(timeout=1.0)
         if self.__ros_node:
@@ -154,23 +248,20 @@ class ESPKinesisManager:
             rclpy.shutdown()
 
         self.__ros_node = None
+        self.__ros_executor = None
         self.__ros_thread = None
-        self.__is_ros_running = False
+        self.__ros_subs = {}
         self.__logger.info("Stopped ROS integration")
 
-    def __ros_spin(self):
-        while self.__is_ros_running and rclpy.ok():
-            rclpy.spin_once(self.__ros_node)
-
     def __update_ros_subs(self):
         if not self.__is_ros_running and self.__ros_node:
             self.__logger.error("ROS integration not running")
             return
 
-        for target_id in list(self.__ros_subs.keys()):
-            if not any(target.id == target_id for target in self.__targets):
-                self.__ros_node.destroy_subscription(self.__ros_subs[target_id])
-                del self.__ros_subs[target_id]
+        current_ids = {target.id for target in self.__targets}
+        for target_id in list(self.__ros_subs):  # Snapshot, popped below
+            if target_id not in current_ids:
+                self.__ros_node.destroy_subscription(self.__ros_subs.pop(target_id))
                 self.__logger.debug(f"Removed ROS subscription for target {target_id}")
 
         for target in self.__targets:
@@ -179,9 +270,7 @@ class ESPKinesisManager:
                 sub = self.__ros_node.create_subscription(
                     ChannelOverride,
                     f"espkinesis/{target.id}/channel_override",
-                    lambda msg, target_id=target.id: self.__process_channel_override(
-                        msg, target_id
-                    ),
+                    partial(self.__process_channel_override, target_id=target.id),
                     qos,
                 )
                 self.__ros_subs[target.id] = sub
@@ -205,40 +294,54 @@ class ESPKinesisManager:
 
             if not bypass_safety:
                 if len(channels) > 4:
-                    channels = channels[:4]
+                    del channels[4:]
                     self.__logger.debug(
-                        f"Safety feature applied: limited to first 4 channels for target ID {target_id}"
+                        "Safety feature applied: limited to first 4 channels for target ID %d",
+                        target_id,
                     )
 
             self.__send_override_command(target_id, channels, duration)
             self.__logger.debug(
-                f"Processed ROS2 override command for target ID {target_id}"
+                "Processed ROS2 override command for target ID %d", target_id
             )
         except Exception as e:
             self.__logger.error(
                 f"Error processing ROS2 override command: {e}", exc_info=True
             )
 
+    def __encode_override_command(
+        self, target_id: int, channels: list[int], duration: int
+    ) -> bytes:
+        # Encodes {"type": "override_channels", "target_id": ..., "channels": ...,
+        # "duration": ...}, reusing the constant per-target prefix
+        prefix = self.__override_prefixes.get(target_id)
+        if prefix is None:
+            prefix = (
+                b'{"type":"override_channels","target_id":%d,"channels":' % target_id
+            )
+            self.__override_prefixes[target_id] = prefix
+        return b"".join(
+            (prefix, orjson.dumps(channels), b',"duration":%d}\n' % duration)
+        )
+
     def __send_override_command(
         self, target_id: int, channels: list[int], duration: int
     ):
-        if not self.__is_connected or not self.__serial:
+        loop = self.__serial_loop
+        transport = self.__serial_transport
+        if not self.__is_connected or not transport:
             self.__logger.error("Serial not connected")
             return
 
-        command = {
-            "type": "override_channels",
-            "target_id": target_id,
-            "channels": channels,
-            "duration": duration,
-        }
-
         try:
-            command_json = json.dumps(command) + "\n"
-
-            self.__serial.write(command_json.encode())
+            payload = self.__encode_override_command(target_id, channels, duration)
+            # Transports are not thread-safe, writes are serialized on the loop
+            loop.call_soon_threadsafe(transport.write, payload)
             self.__logger.debug(
-                f"Sent override command to target {target_id}: {channels} for {duration}ms"
+                "Sent override command to target %d: %s for %dms",
+                target_id,
+                channels,
+                duration,
             )
         except Exception as e:
             self.__logger.error(f"Failed to send override command: {e}", exc_info=True)
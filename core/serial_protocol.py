@@ -0,0 +1,38 @@
+import asyncio
+import logging
+from typing import Callable
+
+
+class SerialLineProtocol(asyncio.Protocol):
+    """Split the incoming serial byte stream into newline-terminated lines."""
+
+    def __init__(
+        self,
+        callback_on_line: Callable[[bytes], None],
+        callback_on_connection_lost: Callable[[Exception | None], None],
+    ):
+        self.__callback_on_line = callback_on_line
+        self.__callback_on_connection_lost = callback_on_connection_lost
+
+        self.__buffer = bytearray()
+
+        self.__logger = logging.getLogger(__name__)
+
+    def data_received(self, data: bytes):
+        buffer = self.__buffer
+        buffer += data
+
+        while (newline := buffer.find(b"\n")) != -1:
+            line = bytes(buffer[:newline]).strip()
+            del buffer[: newline + 1]
+            if not line:
+                continue
+
+            try:
+                self.__callback_on_line(line)
+            except Exception as e:
+                self.__logger.error(f"Error handling serial line: {e}", exc_info=True)
+
+    def connection_lost(self, exc: Exception | None):
+        self.__buffer.clear()
+        self.__callback_on_connection_lost(exc)
@@ -1,7 +1,10 @@
 from dataclasses import dataclass, fields
+from typing import ClassVar
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Target:
+    REQUIRED_FIELDS: ClassVar[frozenset[str]]
+
     id: int
     name: str
     mac: str
@@ -14,4 +17,7 @@ class Target:
     @classmethod
     def get_fields(cls) -> list[str]:
         """Return a list of all field names."""
-        return [field.name for field in fields(cls)]
\ No newline at end of file
+        return [field.name for field in fields(cls)]
+
+
+Target.REQUIRED_FIELDS = frozenset(Target.get_fields())
\ No newline at end of file
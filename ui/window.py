@@ -1,12 +1,19 @@
 import PySimpleGUI as sg
 import os
 import logging
+import queue
 
 from core.manager import ESPKinesisManager
 
 
 class ESPKinesisWindow:
-    def __init__(self, theme: str, scale: float, refresh_rate_ms: int = 100):
+    def __init__(
+        self,
+        theme: str,
+        scale: float,
+        refresh_rate_ms: int = 100,
+        max_targets: int = 16,
+    ):
         os.environ["XDG_SESSION_TYPE"] = "xcb"
         sg.theme(theme)
         sg.set_options(
@@ -27,15 +34,17 @@ class ESPKinesisWindow:
         self.__refresh_rate_ms = refresh_rate_ms
         self.__window = None
 
+        # Holds only the latest targets update, drained once per UI tick
+        self.__targets_queue: queue.Queue[list] = queue.Queue(maxsize=1)
+
+        # Target frames are preallocated and reused, slot i shows targets[i]
+        self.__max_targets = max_targets
+        self.__target_slots: list[dict | None] = [None] * max_targets
+        self.__last_targets_count = 0
+
         self.__init_ui()
 
     def __init_ui(self):
-        column_targets_content = [
-            [sg.Text("Connect to ESPKinesis transmitter to view targets")]
-        ]
-        self.__create_window(column_targets_content)
-
-    def __create_window(self, column_targets_content):
         frame_connection = sg.Frame(
             "Connection",
             [
@@ -51,14 +60,27 @@ class ESPKinesisWindow:
             ],
             font=self.__font_larger,
         )
+
+        column_targets_content = [
+            [
+                sg.Text(
+                    "Connect to ESPKinesis transmitter to view targets",
+                    key="-TARGET-PLACEHOLDER-",
+                )
+            ]
+        ]
+        for slot in range(self.__max_targets):
+            column_targets_content.append([sg.pin(self.__create_frame_target(slot))])
+
         frame_targets = sg.Frame(
             "Targets",
             [
                 [
                     sg.Column(
                         column_targets_content,
+                        key="-TARGET-COLUMN-",
                         size=(800, 400),
-                        scrollable=False,
+                        scrollable=True,
                         vertical_scroll_only=True,
                     ),
                 ]
@@ -67,8 +89,6 @@ class ESPKinesisWindow:
         )
         layout = [[frame_connection], [frame_targets]]
 
-        if self.__window:
-            self.__window.close()
         self.__window = sg.Window(
             self.__window_title,
             layout=layout,
@@ -78,30 +98,83 @@ class ESPKinesisWindow:
             icon=sg.DEFAULT_BASE64_ICON,
         )
 
-    def __create_frame_target(self, target: dict):
-        get_element_key = lambda target_id, element_type: f"-TARGET-{target_id}-{element_type}-"
+    @staticmethod
+    def __get_target_key(slot: int, element_type: str) -> str:
+        return f"-TARGET-{slot}-{element_type}-"
 
+    def __create_frame_target(self, slot: int):
         target_frame = sg.Frame(
-            f"Target {target['id']}",
+            "",
             [
                 [
-                    sg.Text(f"Target {target['id']} Control"),
+                    sg.Text("", key=self.__get_target_key(slot, "TITLE")),
                     sg.Button(
                         "Override: OFF",
-                        key=get_element_key(target["id"], "OVERRIDE"),
+                        key=self.__get_target_key(slot, "OVERRIDE"),
                         enable_events=True,
                     ),
                     sg.Text("MAC: "),
-                    sg.Text(target["mac"])
+                    sg.Text("", key=self.__get_target_key(slot, "MAC")),
                 ]
             ],
+            key=self.__get_target_key(slot, "FRAME"),
             font=self.__font_larger,
+            visible=False,
         )
-        
+
         return target_frame
 
+    def __update_targets(self, targets: list):
+        targets_count = len(targets)
+        if targets_count > self.__max_targets:
+            if self.__last_targets_count <= self.__max_targets:
+                self.__logger.warning(
+                    "Received %d targets, only showing the first %d",
+                    targets_count,
+                    self.__max_targets,
+                )
+            targets = targets[: self.__max_targets]
+        self.__last_targets_count = targets_count
+
+        layout_changed = False
+        for slot in range(self.__max_targets):
+            target = targets[slot] if slot < len(targets) else None
+            previous = self.__target_slots[slot]
+            if target == previous:
+                continue
+
+            frame_key = self.__get_target_key(slot, "FRAME")
+            if target is None:
+                self.__window[frame_key].update(visible=False)
+                layout_changed = True
+            else:
+                if previous is None:
+                    self.__window[frame_key].update(visible=True)
+                    layout_changed = True
+                if previous is None or previous["id"] != target["id"]:
+                    self.__window[frame_key].update(value=f"Target {target['id']}")
+                    self.__window[self.__get_target_key(slot, "TITLE")].update(
+                        f"Target {target['id']} Control"
+                    )
+                if previous is None or previous["mac"] != target["mac"]:
+                    self.__window[self.__get_target_key(slot, "MAC")].update(
+                        target["mac"]
+                    )
+            self.__target_slots[slot] = target
+
+        if layout_changed:
+            self.__window["-TARGET-PLACEHOLDER-"].update(visible=not targets)
+            self.__window["-TARGET-COLUMN-"].contents_changed()
+
+        return len(targets)
+
     def __on_targets_update(self, targets: list):
-        self.__window.write_event_value("-TARGETS-UPDATE-", value=targets)
+        # Called from the serial thread, the newest update replaces any pending one
+        try:
+            self.__targets_queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.__targets_queue.put_nowait(targets)
 
     def run(self):
         self.__logger.info("Starting UI event loop")
@@ -114,7 +187,16 @@ class ESPKinesisWindow:
             if event == sg.WINDOW_CLOSED:
                 break
 
-            elif event == "-CF-REFRESH-":
+            try:
+                targets = self.__targets_queue.get_nowait()
+            except queue.Empty:
+                pass
+            else:
+                self.__logger.debug("Updating targets display")
+                shown = self.__update_targets(targets)
+                self.__logger.info(f"Updated display with {shown} targets")
+
+            if event == "-CF-REFRESH-":
                 self.__logger.debug("Refreshing port list")
                 ports = self.__manager.get_all_ports()
                 self.__window["-CF-PORTS-"].update(values=ports)
@@ -135,19 +217,9 @@ class ESPKinesisWindow:
                 self.__manager.disconnect()
                 self.__window["-CF-CONNECT-"].update(disabled=False)
                 self.__window["-CF-DISCONNECT-"].update(disabled=True)
-                self.__window["-TARGET-COLUMN-"].update(
-                    [sg.Text("Connect to ESPKinesis transmitter to view targets")]
-                )
-                self.__logger.info("Disconnected successfully")
-
-            elif event == "-TARGETS-UPDATE-":
-                self.__logger.debug("Updating targets display")
-                targets_column = []
-                targets = value[event]
-                for target in targets:
-                    targets_column.append(self.__create_frame_target(target))
-
-                # self.__window["-TARGET-COLUMN-"].update([[sg.Text("Yes!!!")]])
-                content = [[sg.Text("Yes!!!")]]
-                self.__create_window(content)
-                self.__logger.info(f"Updated display with {len(targets_column)} targets")
+                try:
+                    self.__targets_queue.get_nowait()  # Drop any stale update
+                except queue.Empty:
+                    pass
+                self.__update_targets([])
+                self.__logger.info("Disconnected successfully")
\ No newline at end of file